@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from foodgram.db import check_database_connection
+
+        from . import signals  # noqa: F401
+        request_started.connect(check_database_connection)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth:token:{key}'
+
+
+def token_cache_key(key):
+    return TOKEN_CACHE_KEY.format(key=key)
+
+
+def invalidate_tokens(keys):
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication with token to user lookups cached.
+
+    Cached entries live for TOKEN_CACHE_TIMEOUT seconds and are dropped
+    when the token is deleted or its user is saved.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = cache.get(token_cache_key(key))
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(
+                token_cache_key(key), credentials,
+                settings.TOKEN_CACHE_TIMEOUT
+            )
+        user, token = credentials
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'User inactive or deleted.'
+            )
+        return user, token
@@ -0,0 +1,265 @@
+import hashlib
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, quote_etag
+from foodgram.routers import primary_reads
+from rest_framework import status
+from rest_framework.response import Response
+from users.models import Subscription
+
+RECIPE_LIST_QUERY_PARAMS = (
+    'tags', 'author', 'search', 'ordering', 'page', 'limit'
+)
+RECIPE_LIST_VERSION_KEY = 'recipes:list:version'
+RECIPE_LIST_KEY = 'recipes:list:{fragment_version}:{version}:{digest}'
+RECIPE_FACETS_QUERY_PARAMS = ('tags', 'author')
+RECIPE_FACETS_KEY = 'recipes:facets:{version}:{digest}'
+RECIPE_FRAGMENT_KEY = 'recipes:fragment:{version}:{pk}'
+# Bump when the serialized representation of a recipe changes, list
+# pages made of the fragments are keyed by it as well.
+RECIPE_FRAGMENT_VERSION = 2
+USER_DEPENDENT_QUERY_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+USER_STATE_KEY = 'users:state:{user_id}'
+USER_STATE_VERSION_KEY = 'users:state:version:{user_id}'
+
+
+def get_recipe_list_version():
+    """Return the stamp of cached recipe list pages.
+
+    The stamp is a timestamp rather than a counter, so an evicted stamp
+    never makes outdated pages valid again.
+    """
+    version = cache.get(RECIPE_LIST_VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        cache.add(RECIPE_LIST_VERSION_KEY, version, None)
+    return version
+
+
+def normalize_query_params(request, names):
+    """Build a stable representation of the query params that matter."""
+    return '&'.join(
+        f'{name}={",".join(sorted(request.query_params.getlist(name)))}'
+        for name in names
+        if name in request.query_params
+    )
+
+
+def get_query_digest(request, names):
+    query = normalize_query_params(request, names)
+    return hashlib.md5(f'{request.get_host()}?{query}'.encode()).hexdigest()
+
+
+def recipe_list_cache_key(request):
+    return RECIPE_LIST_KEY.format(
+        fragment_version=RECIPE_FRAGMENT_VERSION,
+        version=get_recipe_list_version(),
+        digest=get_query_digest(request, RECIPE_LIST_QUERY_PARAMS),
+    )
+
+
+def recipe_facets_cache_key(request):
+    """Facets share the list stamp, as they change with list pages."""
+    return RECIPE_FACETS_KEY.format(
+        version=get_recipe_list_version(),
+        digest=get_query_digest(request, RECIPE_FACETS_QUERY_PARAMS),
+    )
+
+
+def recipe_fragment_key(pk):
+    return RECIPE_FRAGMENT_KEY.format(
+        version=RECIPE_FRAGMENT_VERSION,
+        pk=pk,
+    )
+
+
+def get_recipe_fragments(recipe_ids):
+    """Return cached serialized recipes by id, missing ones are skipped."""
+    keys = {recipe_fragment_key(pk): pk for pk in recipe_ids}
+    return {
+        keys[key]: fragment
+        for key, fragment in cache.get_many(keys).items()
+    }
+
+
+def set_recipe_fragments(recipes):
+    """Cache serialized recipes and return them by id."""
+    fragments = {recipe['id']: recipe for recipe in recipes}
+    cache.set_many(
+        {recipe_fragment_key(pk): data for pk, data in fragments.items()},
+        settings.RECIPE_CACHE_TIMEOUT,
+    )
+    return fragments
+
+
+def invalidate_recipe_lists():
+    cache.set(RECIPE_LIST_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_recipes(recipe_ids):
+    """Drop cached fragments of the recipes and every cached list page."""
+    cache.delete_many([recipe_fragment_key(pk) for pk in recipe_ids])
+    invalidate_recipe_lists()
+
+
+def get_cached_response(key, render):
+    """Return a response built from cached data or render and cache it.
+
+    Only successful responses are cached, errors are returned as is.
+    """
+    data = cache.get(key)
+    if data is not None:
+        return Response(data)
+    with primary_reads():
+        response = render()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+    return response
+
+
+def is_shared_request(request):
+    """Check that the response does not depend on the user.
+
+    Filtering by favorites or shopping cart changes the recipes on the
+    page itself, such pages cannot be shared between users.
+    """
+    return not request.user.is_authenticated or not any(
+        request.query_params.get(name) not in (None, '', '0')
+        for name in USER_DEPENDENT_QUERY_PARAMS
+    )
+
+
+@contextmanager
+def as_anonymous(request):
+    """Handle the request as made by an anonymous user.
+
+    User annotations come out empty and are filled later by
+    `apply_user_state`, so the result can be shared between users.
+    """
+    user = request.user
+    request.user = AnonymousUser()
+    try:
+        yield request
+    finally:
+        request.user = user
+
+
+def get_shared_response(request, key, render):
+    """Return user-independent cached response data."""
+    with as_anonymous(request):
+        return get_cached_response(key, render)
+
+
+def get_user_state(user):
+    """Return ids of the user's favorites, cart recipes and authors."""
+    key = USER_STATE_KEY.format(user_id=user.pk)
+    state = cache.get(key)
+    if state is None:
+        with primary_reads():
+            state = {
+                'favorites': set(
+                    user.favorite.values_list('recipe_id', flat=True)
+                ),
+                'shopping_cart': set(
+                    user.shopping_cart.values_list('recipe_id', flat=True)
+                ),
+                'subscriptions': set(
+                    Subscription.objects.filter(user=user).values_list(
+                        'author_id', flat=True
+                    )
+                ),
+            }
+        cache.set(key, state, settings.RECIPE_CACHE_TIMEOUT)
+    return state
+
+
+def get_user_state_version(user):
+    """Return the stamp of the last change of the user state.
+
+    Like the list stamp it is a timestamp, which also serves as the
+    modification time of the state. Anonymous users have no state.
+    """
+    if not user.is_authenticated:
+        return 0
+    key = USER_STATE_VERSION_KEY.format(user_id=user.pk)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+    return version
+
+
+def invalidate_user_state(user_id):
+    cache.set(
+        USER_STATE_VERSION_KEY.format(user_id=user_id), time.time_ns(), None
+    )
+    cache.delete(USER_STATE_KEY.format(user_id=user_id))
+
+
+def apply_user_state(data, user):
+    """Fill user annotations of serialized recipes in place."""
+    if not user.is_authenticated:
+        return data
+    if isinstance(data, dict):
+        recipes = data.get('results', [data])
+    else:
+        recipes = data
+    state = get_user_state(user)
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in state['favorites']
+        recipe['is_in_shopping_cart'] = (
+            recipe['id'] in state['shopping_cart']
+        )
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in state['subscriptions']
+        )
+    return data
+
+
+def patch_response_caching(response, request):
+    """Allow shared caches to store responses for anonymous users only."""
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True, no_cache=True)
+    else:
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.RECIPE_CACHE_MAX_AGE,
+        )
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+def get_recipes_conditional_response(request, response, recipes):
+    """Validate the client copy of serialized recipes.
+
+    The ETag covers the request path with query, modification times of
+    the recipes and the user state version. Last-Modified is the latest
+    of those times. Returns a 304 response if the client copy is fresh,
+    otherwise the given response with the validators set.
+    """
+    user_state_version = get_user_state_version(request.user)
+    validators = [request.get_full_path(), str(user_state_version)]
+    timestamps = [user_state_version / 10 ** 9]
+    for recipe in recipes:
+        validators.append(f'{recipe["id"]}:{recipe["updated_at"]}')
+        timestamps.append(parse_datetime(recipe['updated_at']).timestamp())
+    etag = quote_etag(
+        hashlib.md5('|'.join(validators).encode()).hexdigest()
+    )
+    last_modified = int(max(timestamps))
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+        response=response,
+    )
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.cache import cache
+from foodgram.routers import primary_reads
+from users.models import Subscription
+
+FEED_CACHE_KEY = 'feed:{user_id}'
+
+
+def filter_feed(queryset, user):
+    """Limit recipes to the authors the user is subscribed to.
+
+    Users subscribed to more than FEED_FANOUT_THRESHOLD authors get the
+    ids of their latest FEED_CACHE_SIZE feed recipes precomputed and kept
+    in the cache for FEED_CACHE_TIMEOUT seconds.
+    """
+    authors = Subscription.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    )
+    # Fetching one id past the threshold tells which way to go without
+    # counting the subscriptions.
+    author_ids = list(authors[:settings.FEED_FANOUT_THRESHOLD + 1])
+    if len(author_ids) <= settings.FEED_FANOUT_THRESHOLD:
+        return queryset.filter(author_id__in=author_ids)
+    key = FEED_CACHE_KEY.format(user_id=user.pk)
+    recipe_ids = cache.get(key)
+    if recipe_ids is None:
+        with primary_reads():
+            recipe_ids = list(
+                queryset.model.objects.filter(
+                    author_id__in=authors
+                ).order_by('-pub_date', '-id').values_list(
+                    'id', flat=True
+                )[:settings.FEED_CACHE_SIZE]
+            )
+        cache.set(key, recipe_ids, settings.FEED_CACHE_TIMEOUT)
+    return queryset.filter(pk__in=recipe_ids)
+
+
+def invalidate_feed(user):
+    cache.delete(FEED_CACHE_KEY.format(user_id=user.pk))
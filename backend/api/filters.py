@@ -1,4 +1,5 @@
 import django_filters
+from django.db.models import F
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -27,10 +28,26 @@ class RecipeFilter(django_filters.FilterSet):
     is_in_shopping_cart = django_filters.NumberFilter(
         method='get_is_in_shopping_cart'
     )
+    search = django_filters.CharFilter(method='get_search')
+    ordering = django_filters.ChoiceFilter(
+        choices=(
+            ('popular', 'popular'),
+            ('trending', 'trending'),
+        ),
+        method='get_ordering',
+    )
+
+    RANKING_FIELDS = {
+        'popular': 'ranking__popular_score',
+        'trending': 'ranking__trending_score',
+    }
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'tags', 'author', 'is_favorited', 'is_in_shopping_cart',
+            'search', 'ordering'
+        )
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -39,7 +56,7 @@ class RecipeFilter(django_filters.FilterSet):
                 favorite__user=user,
                 is_favorited=True,
             )
-        return Recipe.objects.all()
+        return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
@@ -48,4 +65,14 @@ class RecipeFilter(django_filters.FilterSet):
                 shopping_cart__user=user,
                 is_in_shopping_cart=True,
             )
-        return Recipe.objects.all()
+        return queryset
+
+    def get_search(self, queryset, name, value):
+        return queryset.search(value)
+
+    def get_ordering(self, queryset, name, value):
+        """Order by scores precomputed with `update_rankings` command."""
+        return queryset.order_by(
+            F(self.RANKING_FIELDS[value]).desc(nulls_last=True),
+            '-pub_date',
+        )
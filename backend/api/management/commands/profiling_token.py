@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+from foodgram.profiling import make_profiling_token
+
+
+class Command(BaseCommand):
+    """Command to issue a token for profiling requests"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'name',
+            help='Who the token is issued to, for the record',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_profiling_token(options['name']))
+        self.stderr.write(
+            'Send it in the X-Profile-Token header with the profile query '
+            f'param, valid for {settings.PROFILING_TOKEN_MAX_AGE} seconds'
+        )
@@ -0,0 +1,81 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from api.caching import invalidate_recipe_lists
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from recipes.models import Favorite, RecipeRanking, ShoppingCart
+
+FAVORITE_WEIGHT = 1.0
+SHOPPING_CART_WEIGHT = 0.5
+
+
+class Command(BaseCommand):
+    """Command to precompute popular and trending recipe rankings"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life',
+            type=float,
+            default=3,
+            help='Trending score half-life in days',
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=30,
+            help='Days of activity taken into account for trending',
+        )
+
+    @staticmethod
+    def count_by_recipe(model):
+        return model.objects.order_by().values('recipe_id').annotate(
+            count=Count('id')
+        ).values_list('recipe_id', 'count')
+
+    @staticmethod
+    def count_by_recipe_and_day(model, since):
+        return model.objects.filter(add_date__gte=since).order_by().annotate(
+            day=TruncDate('add_date')
+        ).values('recipe_id', 'day').annotate(
+            count=Count('id')
+        ).values_list('recipe_id', 'day', 'count')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        today = timezone.localdate(now)
+        half_life = options['half_life']
+        since = now - timedelta(days=options['window'])
+        popular = defaultdict(float)
+        trending = defaultdict(float)
+        for model, weight in (
+            (Favorite, FAVORITE_WEIGHT),
+            (ShoppingCart, SHOPPING_CART_WEIGHT),
+        ):
+            for recipe_id, count in self.count_by_recipe(model):
+                popular[recipe_id] += weight * count
+            for recipe_id, day, count in self.count_by_recipe_and_day(
+                model, since
+            ):
+                age = (today - day).days
+                trending[recipe_id] += weight * count * 0.5 ** (
+                    age / half_life
+                )
+        rankings = [
+            RecipeRanking(
+                recipe_id=recipe_id,
+                popular_score=score,
+                trending_score=trending.get(recipe_id, 0),
+            )
+            for recipe_id, score in popular.items()
+        ]
+        with transaction.atomic():
+            RecipeRanking.objects.all().delete()
+            RecipeRanking.objects.bulk_create(rankings, batch_size=1000)
+        invalidate_recipe_lists()
+        self.stdout.write(
+            f'Rankings have been updated for {len(rankings)} recipes'
+        )
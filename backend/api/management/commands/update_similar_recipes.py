@@ -0,0 +1,12 @@
+from api.similarity import update_similar_recipes
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    """Command to precompute similar recipes"""
+
+    def handle(self, *args, **kwargs):
+        count = update_similar_recipes()
+        self.stdout.write(
+            f'Similar recipes have been updated for {count} recipes'
+        )
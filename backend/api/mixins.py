@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import cache
+from foodgram.routers import replica_reads
+from rest_framework.permissions import SAFE_METHODS
+
+STICKY_COOKIE = 'primary_db'
+STICKY_USER_KEY = 'replica:sticky:{user_id}'
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from database replicas.
+
+    After a write the client reads from the primary database for
+    REPLICA_STICKINESS_SECONDS, marked both with a cookie and with a
+    per-user cache flag, so users always see their own changes.
+    """
+
+    def is_sticky(self, request):
+        return STICKY_COOKIE in request.COOKIES or (
+            request.user.is_authenticated
+            and cache.get(STICKY_USER_KEY.format(user_id=request.user.pk))
+        )
+
+    def mark_sticky(self, request, response):
+        timeout = settings.REPLICA_STICKINESS_SECONDS
+        response.set_cookie(
+            STICKY_COOKIE, '1', max_age=timeout, httponly=True
+        )
+        if request.user.is_authenticated:
+            cache.set(
+                STICKY_USER_KEY.format(user_id=request.user.pk),
+                True,
+                timeout,
+            )
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication runs first: fresh tokens may not be replicated.
+        super().initial(request, *args, **kwargs)
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and not self.is_sticky(request)
+        ):
+            self.replica_reads_token = replica_reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        token = getattr(self, 'replica_reads_token', None)
+        if token is not None:
+            replica_reads.reset(token)
+            self.replica_reads_token = None
+        elif settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            self.mark_sticky(request, response)
+        return response
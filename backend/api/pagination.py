@@ -1,5 +1,5 @@
 from django.core import paginator
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
@@ -7,3 +7,10 @@ class CustomPagination(PageNumberPagination):
     django_paginator_class = paginator.Paginator
     page_query_param = 'page'
     page_size_query_param = 'limit'
+
+
+class FeedPagination(CursorPagination):
+    """Keyset pagination by publication date."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
@@ -3,6 +3,7 @@ import base64
 from django.contrib.auth.password_validation import validate_password
 from django.core import exceptions
 from django.core.files.base import ContentFile
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
                             ShoppingCart, Tag)
@@ -77,7 +78,7 @@ class SetPasswordSerializer(serializers.Serializer):
                 }
             )
         instance.set_password(new_password)
-        instance.save()
+        instance.save(update_fields=['password'])
         return validated_data
 
 
@@ -85,7 +86,8 @@ class SubscriptionUserSerializer(CustomUserSerializer):
     """Subscription user Serializer."""
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(
-        source='recipes.count',
+        source='stats.recipes_count',
+        default=0,
         read_only=True
     )
 
@@ -106,6 +108,33 @@ class SubscriptionUserSerializer(CustomUserSerializer):
         return RecipeShortSerializer(recipes, many=True).data
 
 
+class AuthorProfileSerializer(CustomUserSerializer):
+    """Author with counters of recipes, subscribers and favorites."""
+    recipes_count = serializers.IntegerField(
+        source='stats.recipes_count',
+        default=0,
+        read_only=True
+    )
+    subscribers_count = serializers.IntegerField(
+        source='stats.subscribers_count',
+        default=0,
+        read_only=True
+    )
+    favorites_count = serializers.IntegerField(
+        source='stats.favorites_count',
+        default=0,
+        read_only=True
+    )
+
+    class Meta:
+        model = User
+        fields = (
+            'email', 'id', 'username', 'first_name', 'last_name',
+            'is_subscribed', 'recipes_count', 'subscribers_count',
+            'favorites_count'
+        )
+
+
 class SubscriptionSerializer(CustomUserSerializer):
     """Subscription model Serializer."""
 
@@ -204,9 +233,25 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+            'updated_at'
         )
 
+    extra_annotations = ('search_snippet', 'missing_ingredients')
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name in self.extra_annotations:
+            if hasattr(instance, name):
+                data[name] = getattr(instance, name)
+        return data
+
 
 class RecipeWriteSerializer(RecipeSerializer):
     """Recipe model (create recipe) Serializer."""
@@ -235,6 +280,7 @@ class RecipeWriteSerializer(RecipeSerializer):
                 )
             )
         IngredientAmount.objects.bulk_create(ingredients_list)
+        Recipe.objects.filter(pk=recipe.pk).update_ingredient_ids()
 
     def validate(self, data):
         cooking_time = data.get('cooking_time')
@@ -262,15 +308,21 @@ class RecipeWriteSerializer(RecipeSerializer):
             )
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         ingredients = validated_data.pop('ingredients_amount')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data, author=author)
+        recipe = Recipe.objects.create(
+            **validated_data,
+            author=author,
+            ingredients_count=len(ingredients),
+        )
         recipe.tags.add(*tags)
         self.save_ingredients(recipe, ingredients)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
@@ -280,13 +332,16 @@ class RecipeWriteSerializer(RecipeSerializer):
             instance.cooking_time
         )
         ingredients = validated_data.pop('ingredients_amount')
+        instance.ingredients_count = len(ingredients)
         tags = validated_data.pop('tags')
+        # Saved first, the loaded ingredient_ids would overwrite the ones
+        # rebuilt by save_ingredients.
+        instance.save()
         instance.tags.clear()
         instance.tags.add(*tags)
         instance.ingredients.clear()
         recipe = instance
         self.save_ingredients(recipe, ingredients)
-        instance.save()
         return instance
 
 
@@ -334,7 +389,7 @@ class ShoppingCartSerializer(RecipeShortSerializer):
 
     class Meta:
         model = ShoppingCart
-        fields = ('user', 'recipe')
+        fields = ('user', 'recipe', 'servings')
         validators = [
             UniqueTogetherValidator(
                 queryset=ShoppingCart.objects.all(),
@@ -0,0 +1,218 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from jobs.queue import enqueue
+from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                            ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import AuthorStats, Subscription, User
+
+from .authentication import invalidate_tokens
+from .caching import (invalidate_recipe_lists, invalidate_recipes,
+                      invalidate_user_state)
+from .tasks import update_recipes
+
+# Fields of the author serialized with their recipes.
+AUTHOR_FIELDS = frozenset({'username', 'email', 'first_name', 'last_name'})
+
+
+def recipes_changed(recipe_ids, composition_ids=()):
+    """Invalidate caches of changed recipes, refresh denormalized data.
+
+    Denormalized data is updated by a background job. Changes of the
+    recipe composition (ingredients and tags) also refresh precomputed
+    similar recipes.
+    """
+    Recipe.objects.filter(pk__in=recipe_ids).touch()
+    invalidate_recipes(recipe_ids)
+    if composition_ids:
+        enqueue(update_recipes, sorted(composition_ids), composition=True)
+    other_ids = set(recipe_ids) - set(composition_ids)
+    if other_ids:
+        enqueue(update_recipes, sorted(other_ids))
+
+
+class RecipeChanges:
+    """Recipes changed within a transaction, handled once on commit."""
+
+    def __init__(self):
+        self.recipe_ids = set()
+        self.composition_ids = set()
+
+    def __call__(self):
+        recipes_changed(self.recipe_ids, self.composition_ids)
+
+
+def invalidate_on_commit(recipe_ids, composition=False):
+    """Handle the recipe changes once the transaction is committed.
+
+    Saving a recipe fires signals for the recipe, its tags and every
+    ingredient row, they are collected into a single callback.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        recipes_changed(recipe_ids, recipe_ids if composition else ())
+        return
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, RecipeChanges):
+            changes = callback
+            break
+    else:
+        changes = RecipeChanges()
+        transaction.on_commit(changes)
+    changes.recipe_ids.update(recipe_ids)
+    if composition:
+        changes.composition_ids.update(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    invalidate_on_commit([instance.pk], composition=created)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    invalidate_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_on_commit([instance.recipe_id], composition=True)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_on_commit([instance.pk], composition=True)
+    elif pk_set:
+        invalidate_on_commit(list(pk_set), composition=True)
+    else:
+        transaction.on_commit(invalidate_recipe_lists)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_reference_changed(sender, instance, created=False, **kwargs):
+    """Refresh recipes using a renamed or deleted tag or ingredient.
+
+    New ones are not used by any recipe yet, which saves a query per
+    row when import_data creates them.
+    """
+    if created:
+        return
+    recipe_ids = list(instance.recipes.values_list('id', flat=True))
+    if not recipe_ids:
+        return
+    invalidate_on_commit(recipe_ids)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    """Drop cached credentials after password change or deactivation."""
+    if not created:
+        invalidate_tokens(
+            Token.objects.filter(user=instance).values_list('key', flat=True)
+        )
+
+
+@receiver(pre_save, sender=User)
+def author_saving(sender, instance, update_fields, **kwargs):
+    """Note whether fields shown with the author's recipes change."""
+    if update_fields is not None:
+        changed = not AUTHOR_FIELDS.isdisjoint(update_fields)
+    elif instance.pk is None:
+        changed = False
+    else:
+        stored = User.objects.filter(pk=instance.pk).values(
+            *AUTHOR_FIELDS
+        ).first()
+        changed = stored is not None and any(
+            stored[name] != getattr(instance, name) for name in AUTHOR_FIELDS
+        )
+    instance._author_changed = changed
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, **kwargs):
+    """Refresh recipes of the author, other user fields are not shown."""
+    if getattr(instance, '_author_changed', False):
+        invalidate_on_commit(
+            list(instance.recipes.values_list('id', flat=True))
+        )
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+
+
+def update_author_stats(user_id, name, signal, created):
+    """Count a row added on creation and removed on deletion."""
+    if signal is post_delete:
+        delta = -1
+    elif created:
+        delta = 1
+    else:
+        return
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{name: Greatest(F(name) + delta, 0)}
+    )
+    if not updated and delta > 0:
+        # Authors created before their stats row have no counters yet.
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        AuthorStats.objects.filter(user_id=user_id).update(
+            **{name: F(name) + delta}
+        )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def author_recipes_changed(sender, instance, signal, created=False,
+                           **kwargs):
+    update_author_stats(instance.author_id, 'recipes_count', signal, created)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def author_subscribers_changed(sender, instance, signal, created=False,
+                               **kwargs):
+    update_author_stats(
+        instance.author_id, 'subscribers_count', signal, created
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def author_favorites_changed(sender, instance, signal, created=False,
+                             **kwargs):
+    author_id = Recipe.objects.filter(pk=instance.recipe_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is not None:
+        update_author_stats(author_id, 'favorites_count', signal, created)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def user_state_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_user_state(instance.user_id))
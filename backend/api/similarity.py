@@ -0,0 +1,164 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from recipes.models import IngredientAmount, Recipe, SimilarRecipe
+
+SIMILAR_RECIPES_LIMIT = 10
+BATCH_SIZE = 500
+
+
+def load_features(recipe_ids=None):
+    """Return sparse feature sets of recipes: ingredient and tag ids."""
+    amounts = IngredientAmount.objects.order_by()
+    tags = Recipe.tags.through.objects.order_by()
+    if recipe_ids is not None:
+        amounts = amounts.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    features = defaultdict(set)
+    for recipe_id, ingredient_id in amounts.values_list(
+        'recipe_id', 'ingredient_id'
+    ):
+        features[recipe_id].add(('ingredient', ingredient_id))
+    for recipe_id, tag_id in tags.values_list('recipe_id', 'tag_id'):
+        features[recipe_id].add(('tag', tag_id))
+    return features
+
+
+def build_index(features):
+    """Map ingredient features to recipes having them.
+
+    Tags are shared by too many recipes to narrow down candidates, so
+    they only contribute to the score.
+    """
+    index = defaultdict(list)
+    for recipe_id, recipe_features in features.items():
+        for feature in recipe_features:
+            if feature[0] == 'ingredient':
+                index[feature].append(recipe_id)
+    return index
+
+
+def find_similar(recipe_id, features, index):
+    """Return the most similar recipes by Jaccard index of features.
+
+    Shared features are counted over the inverted index, which is the
+    row of the sparse product of the feature matrix with its transpose.
+    """
+    recipe_features = features[recipe_id]
+    shared = Counter()
+    for feature in recipe_features:
+        shared.update(index.get(feature, ()))
+    for feature in recipe_features:
+        if feature[0] == 'tag':
+            for candidate in shared:
+                if feature in features[candidate]:
+                    shared[candidate] += 1
+    shared.pop(recipe_id, None)
+    scores = (
+        (
+            count / (
+                len(recipe_features) + len(features[candidate]) - count
+            ),
+            candidate,
+        )
+        for candidate, count in shared.items()
+    )
+    return heapq.nlargest(SIMILAR_RECIPES_LIMIT, scores)
+
+
+def save_similar(rows):
+    """Replace stored neighbors of recipes with the computed ones."""
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe_id__in=rows).delete()
+        SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=score)
+            for recipe_id, similar in rows.items()
+            for score, similar_id in similar
+        )
+
+
+def update_similar_recipes():
+    """Recompute neighbors of every recipe in batches."""
+    features = load_features()
+    index = build_index(features)
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        save_similar({
+            recipe_id: find_similar(recipe_id, features, index)
+            for recipe_id in recipe_ids[start:start + BATCH_SIZE]
+            if recipe_id in features
+        })
+    SimilarRecipe.objects.exclude(recipe_id__in=features).delete()
+    return len(recipe_ids)
+
+
+def shares_ingredient(features, other_features):
+    return any(
+        feature[0] == 'ingredient' for feature in features & other_features
+    )
+
+
+def get_score(features, other_features):
+    """Return the Jaccard index of two feature sets."""
+    shared = len(features & other_features)
+    return shared / (len(features) + len(other_features) - shared)
+
+
+def refresh_similar_recipes(recipe_ids):
+    """Recompute neighbors of new or edited recipes.
+
+    Only recipes sharing an ingredient with them, or listing them as
+    neighbors, are loaded. For each of those recipes the score with the
+    edited ones is merged into its stored top of neighbors, and the
+    edited recipes no longer sharing an ingredient with it are dropped.
+    Lists shortened this way are filled up by `update_similar_recipes`.
+    """
+    recipe_ids = set(recipe_ids)
+    ingredient_ids = IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values('ingredient_id')
+    candidate_ids = set(
+        IngredientAmount.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    candidate_ids.update(
+        SimilarRecipe.objects.filter(
+            similar_id__in=recipe_ids
+        ).values_list('recipe_id', flat=True)
+    )
+    candidate_ids -= recipe_ids
+    features = load_features(candidate_ids | recipe_ids)
+    index = build_index(features)
+    rows = {
+        recipe_id: find_similar(recipe_id, features, index)
+        for recipe_id in recipe_ids
+    }
+    stored = defaultdict(dict)
+    for candidate_id, similar_id, score in SimilarRecipe.objects.filter(
+        recipe_id__in=candidate_ids
+    ).values_list('recipe_id', 'similar_id', 'score'):
+        stored[candidate_id][similar_id] = score
+    for candidate_id in candidate_ids:
+        scores = {
+            similar_id: score
+            for similar_id, score in stored[candidate_id].items()
+            if similar_id not in recipe_ids
+        }
+        for recipe_id in recipe_ids:
+            if shares_ingredient(features[candidate_id], features[recipe_id]):
+                scores[recipe_id] = get_score(
+                    features[candidate_id], features[recipe_id]
+                )
+        similar = heapq.nlargest(
+            SIMILAR_RECIPES_LIMIT,
+            ((score, similar_id) for similar_id, score in scores.items()),
+        )
+        if set(similar) != {
+            (score, similar_id)
+            for similar_id, score in stored[candidate_id].items()
+        }:
+            rows[candidate_id] = similar
+    save_similar(rows)
@@ -0,0 +1,18 @@
+from recipes.models import Recipe
+
+from .caching import invalidate_recipe_lists
+from .similarity import refresh_similar_recipes
+
+
+def update_recipes(recipe_ids, composition=False):
+    """Recompute denormalized data of changed recipes too costly to
+    update along with the request.
+
+    Search results depend on it, so list pages are invalidated again
+    once it is updated.
+    """
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    recipes.update_search_vector()
+    if composition:
+        refresh_similar_recipes(recipe_ids)
+    invalidate_recipe_lists()
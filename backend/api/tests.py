@@ -0,0 +1,146 @@
+import tempfile
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Favorite, Ingredient, Recipe, Tag
+from rest_framework.test import APITestCase, APITransactionTestCase
+from users.models import Subscription, User
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+class AuthorStatsTest(APITestCase):
+    """Counters of the author profile."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Author',
+            last_name='Author',
+            password='Old-password-1',
+        )
+        self.reader = User.objects.create_user(
+            email='reader@example.com',
+            username='reader',
+            first_name='Reader',
+            last_name='Reader',
+            password='Reader-password-1',
+        )
+
+    def get_stats(self):
+        response = self.client.get(f'/api/users/{self.author.pk}/profile/')
+        author = response.data['author']
+        return (
+            author['recipes_count'],
+            author['subscribers_count'],
+            author['favorites_count'],
+        )
+
+    def test_password_change_keeps_counters(self):
+        # Loaded before the counters change, like a cached request user.
+        stale_author = User.objects.get(pk=self.author.pk)
+        recipe = Recipe.objects.create(
+            author=self.author, name='Recipe', text='Text', cooking_time=5
+        )
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Favorite.objects.create(user=self.reader, recipe=recipe)
+        self.assertEqual(self.get_stats(), (1, 1, 1))
+
+        self.client.force_authenticate(stale_author)
+        response = self.client.post(
+            '/api/users/set_password/',
+            {
+                'current_password': 'Old-password-1',
+                'new_password': 'New-password-2',
+            },
+        )
+        self.assertEqual(response.status_code, 204)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_stats(), (1, 1, 1))
+
+
+@override_settings(JOBS_MODE='sync', MEDIA_ROOT=tempfile.mkdtemp())
+class RecipeUpdateTest(APITransactionTestCase):
+    """Denormalized data and side effects of a recipe edit."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            email='author@example.com',
+            username='author',
+            first_name='Author',
+            last_name='Author',
+            password='Author-password-1',
+        )
+        self.tag = Tag.objects.create(
+            name='Breakfast', color='#E26C2D', slug='breakfast'
+        )
+        self.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='g')
+            for name in ('Flour', 'Milk', 'Eggs', 'Sugar')
+        ]
+        self.client.force_authenticate(self.author)
+
+    def get_data(self, ingredients):
+        return {
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10}
+                for ingredient in ingredients
+            ],
+            'tags': [self.tag.pk],
+            'image': IMAGE,
+            'name': 'Pancakes',
+            'text': 'Mix and fry.',
+            'cooking_time': 20,
+        }
+
+    def test_patch_updates_ingredients_once(self):
+        response = self.client.post(
+            '/api/recipes/',
+            self.get_data(self.ingredients[:3]),
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                f'/api/recipes/{recipe.pk}/',
+                self.get_data(self.ingredients[2:]),
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        statements = [query['sql'] for query in queries]
+        touches = [
+            sql for sql in statements
+            if sql.startswith('UPDATE "recipes_recipe" SET "updated_at"')
+        ]
+        self.assertEqual(len(touches), 1)
+        inserted = max(
+            index for index, sql in enumerate(statements)
+            if sql.startswith('INSERT INTO "recipes_ingredientamount"')
+        )
+        # A full save after the ingredients were rebuilt would write the
+        # previously loaded ingredient_ids back.
+        self.assertFalse([
+            sql for sql in statements[inserted:]
+            if sql.startswith('UPDATE "recipes_recipe" SET "author_id"')
+        ])
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredients_count, 2)
+        if connection.vendor == 'postgresql':
+            self.assertEqual(
+                recipe.ingredient_ids,
+                sorted(ingredient.pk for ingredient in self.ingredients[2:]),
+            )
+        cookable = self.client.get(
+            '/api/recipes/cookable/',
+            {'ingredients': self.ingredients[0].pk},
+        )
+        self.assertEqual(cookable.data, [])
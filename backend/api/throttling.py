@@ -0,0 +1,121 @@
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """Rate limit with a sliding window counter kept in the cache.
+
+    Requests are counted in fixed windows, the rate over the last
+    `duration` seconds is estimated from the current and the previous
+    counters weighted by their overlap with it. Unlike the request
+    history of SimpleRateThrottle, this costs two cache keys and one
+    increment per request whatever the rate is.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+        counters = self.cache.get_many([previous_key, current_key])
+        self.previous = counters.get(previous_key, 0)
+        self.current = counters.get(current_key, 0)
+        self.elapsed = self.now - window * self.duration
+        weight = 1 - self.elapsed / self.duration
+        if self.previous * weight + self.current >= self.num_requests:
+            return self.throttle_failure()
+        self.increment(current_key)
+        return self.throttle_success()
+
+    def increment(self, key):
+        # Windows are kept for two durations to serve as the previous one.
+        if self.cache.add(key, 1, self.duration * 2):
+            return
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, self.duration * 2)
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Return seconds until the estimated rate drops below the limit."""
+        if self.previous and self.current < self.num_requests:
+            wait = self.duration * (
+                1 - (self.num_requests - self.current) / self.previous
+            ) - self.elapsed
+        else:
+            wait = self.duration - self.elapsed
+        return max(wait, 1)
+
+
+class AnonSlidingWindowThrottle(SlidingWindowThrottle):
+    """Limit requests of anonymous users by IP address."""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request),
+        }
+
+
+class UserSlidingWindowThrottle(SlidingWindowThrottle):
+    """Limit requests of authenticated users by user id."""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': request.user.pk,
+        }
+
+
+class ActionSlidingWindowThrottle(SlidingWindowThrottle):
+    """Limit expensive requests separately from cheap reads.
+
+    The scope is taken from `throttle_scopes` of the view by action,
+    otherwise it is `write` for unsafe methods and `search` for full
+    text search. Other requests are only limited by the user and anon
+    throttles.
+    """
+
+    def __init__(self):
+        # The rate depends on the scope known only from the request.
+        pass
+
+    def get_scope(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        action = getattr(view, 'action', None)
+        if action in scopes:
+            return scopes[action]
+        if request.method not in SAFE_METHODS:
+            return 'write'
+        if request.query_params.get('search'):
+            return 'search'
+        return None
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
@@ -1,26 +1,39 @@
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.db.models import Count, Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from foodgram.routers import primary_reads
 from recipes.models import (Favorite, Ingredient, IngredientAmount, Recipe,
                             ShoppingCart, Tag)
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from users.models import Subscription, User
 
+from .caching import (apply_user_state, as_anonymous, get_cached_response,
+                      get_recipe_fragments, get_recipes_conditional_response,
+                      get_shared_response, is_shared_request,
+                      patch_response_caching, recipe_facets_cache_key,
+                      recipe_list_cache_key, set_recipe_fragments)
+from .feeds import filter_feed, invalidate_feed
 from .filters import IngredientFilter, RecipeFilter
+from .mixins import ReplicaReadMixin
+from .pagination import FeedPagination
 from .permissions import IsAuthorOrAdminOrReadOnly
-from .serializers import (CustomUserCreateSerializer, CustomUserSerializer,
-                          FavoriteSerializer, IngredientSerializer,
-                          RecipeSerializer, RecipeShortSerializer,
-                          RecipeWriteSerializer, SetPasswordSerializer,
-                          ShoppingCartSerializer, SubscriptionSerializer,
-                          SubscriptionUserSerializer, TagSerializer)
+from .serializers import (AuthorProfileSerializer, CustomUserCreateSerializer,
+                          CustomUserSerializer, FavoriteSerializer,
+                          IngredientSerializer, RecipeSerializer,
+                          RecipeShortSerializer, RecipeWriteSerializer,
+                          SetPasswordSerializer, ShoppingCartSerializer,
+                          SubscriptionSerializer, SubscriptionUserSerializer,
+                          TagSerializer)
 
 
 class UserViewSet(
+    ReplicaReadMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -35,6 +48,8 @@ class UserViewSet(
             return SubscriptionUserSerializer
         if self.action in ('list', 'retrieve', 'me'):
             return CustomUserSerializer
+        if self.action == 'profile':
+            return AuthorProfileSerializer
         if self.action == 'set_password':
             return SetPasswordSerializer
         return CustomUserCreateSerializer
@@ -82,6 +97,7 @@ class UserViewSet(
         serializer = SubscriptionSerializer(data=data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        invalidate_feed(user)
         serializer = self.get_serializer(author)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -90,6 +106,7 @@ class UserViewSet(
         user = request.user
         author = get_object_or_404(User, pk=pk)
         Subscription.objects.filter(user=user, author=author).delete()
+        invalidate_feed(user)
         message = {
             'detail': 'You have successfully unsubscribed'
         }
@@ -104,13 +121,38 @@ class UserViewSet(
         user = request.user
         subscriptions = User.objects.filter(
             subscribing__user=user
-        ).prefetch_related('recipes')
+        ).select_related('stats').prefetch_related('recipes')
         page = self.paginate_queryset(subscriptions)
         serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
 
+    @action(
+        detail=True,
+        methods=['GET'],
+        pagination_class=FeedPagination,
+    )
+    def profile(self, request, pk):
+        """Author with counters and recipes paginated from the newest."""
+        author = get_object_or_404(User.objects.select_related('stats'), pk=pk)
+        page = self.paginate_queryset(
+            Recipe.objects.filter(author=author).only(
+                'id', 'name', 'image', 'cooking_time', 'pub_date'
+            )
+        )
+        recipes = RecipeShortSerializer(
+            page,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        response = self.get_paginated_response(recipes.data)
+        response.data = {
+            'author': self.get_serializer(author).data,
+            **response.data,
+        }
+        return response
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Ingredient list."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -118,32 +160,282 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Tag list."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Recipe list."""
     permission_classes = [IsAuthorOrAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    lookup_value_regex = r'\d+'
+    facet_authors_limit = 20
+    throttle_scopes = {
+        'cookable': 'search',
+        'download_shopping_cart': 'download',
+    }
 
     def get_serializer_class(self):
-        if self.action in ('favorite', 'shopping_cart'):
+        if self.action in ('favorite', 'shopping_cart', 'similar'):
             return RecipeShortSerializer
         if self.action in ('create', 'partial_update'):
             return RecipeWriteSerializer
         return RecipeSerializer
 
-    def get_queryset(self):
+    def get_queryset(self, fields=None):
+        """Return recipes loading only what the given fields need."""
         user_id = self.request.user.pk
-        return Recipe.objects.add_user_annotations(user_id).select_related(
-            'author'
-        ).prefetch_related(
-            'ingredients', 'tags'
+        queryset = Recipe.objects.add_user_annotations(user_id).defer(
+            'search_vector'
         )
+        if fields is None or 'author' in fields:
+            queryset = queryset.select_related('author')
+        if fields is None or 'ingredients' in fields:
+            queryset = queryset.prefetch_related(
+                'ingredients_amount__ingredient'
+            )
+        if fields is None or 'tags' in fields:
+            queryset = queryset.prefetch_related('tags')
+        if fields is not None and 'text' not in fields:
+            return queryset.defer('text')
+        return queryset
+
+    def get_requested_fields(self):
+        """Return recipe fields listed in the `fields` query param.
+
+        None means the full representation.
+        """
+        value = self.request.query_params.get('fields')
+        if not value:
+            return None
+        fields = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = fields - set(RecipeSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(sorted(unknown))}'}
+            )
+        return fields | {'id'}
+
+    def select_fields(self, data):
+        """Drop fields which were not requested from serialized recipes."""
+        fields = self.get_requested_fields()
+        if fields is None:
+            return data
+        fields = fields.union(RecipeSerializer.extra_annotations)
+        if isinstance(data, dict) and 'results' in data:
+            data['results'] = self.select_fields(data['results'])
+            return data
+        if isinstance(data, dict):
+            return {name: data[name] for name in data if name in fields}
+        return [self.select_fields(recipe) for recipe in data]
+
+    def get_recipes_response(self, response):
+        """Overlay user state on serialized recipes and validate them.
+
+        Responses for unchanged recipes become 304 Not Modified.
+        """
+        request = self.request
+        if response.status_code != status.HTTP_200_OK:
+            return patch_response_caching(response, request)
+        data = response.data
+        if isinstance(data, dict):
+            recipes = data.get('results', [data])
+        else:
+            recipes = data
+        apply_user_state(data, request.user)
+        response.data = self.select_fields(data)
+        patch_response_caching(response, request)
+        return get_recipes_conditional_response(request, response, recipes)
+
+    def get_recipes_data(self, recipes):
+        """Assemble serialized recipes from cached fragments.
+
+        Only the recipes missing from the cache are loaded and rendered,
+        as for an anonymous user. Annotations of the given recipes that
+        depend on the query, like search snippets, are added on top.
+        """
+        recipes = list(recipes)
+        fragments = get_recipe_fragments(recipe.pk for recipe in recipes)
+        missing = [
+            recipe.pk for recipe in recipes if recipe.pk not in fragments
+        ]
+        if missing:
+            with as_anonymous(self.request), primary_reads():
+                serializer = RecipeSerializer(
+                    self.get_queryset().filter(pk__in=missing),
+                    many=True,
+                    context=self.get_serializer_context(),
+                )
+                fragments.update(set_recipe_fragments(serializer.data))
+        data = []
+        for recipe in recipes:
+            if recipe.pk not in fragments:
+                continue
+            fragment = fragments[recipe.pk]
+            for name in RecipeSerializer.extra_annotations:
+                if hasattr(recipe, name):
+                    fragment[name] = getattr(recipe, name)
+            data.append(fragment)
+        return data
+
+    def render_list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).select_related(
+            None
+        ).prefetch_related(None).only('id')
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_recipes_data(queryset))
+        return self.get_paginated_response(self.get_recipes_data(page))
+
+    def list(self, request, *args, **kwargs):
+        if not is_shared_request(request):
+            return self.get_recipes_response(
+                self.render_list(request, *args, **kwargs)
+            )
+        return self.get_recipes_response(
+            get_shared_response(
+                request,
+                recipe_list_cache_key(request),
+                lambda: self.render_list(request, *args, **kwargs),
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_recipes_data([Recipe(pk=int(kwargs['pk']))])
+        if not data:
+            raise Http404
+        return self.get_recipes_response(Response(data[0]))
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        fields = self.get_requested_fields()
+        queryset = filter_feed(
+            self.filter_queryset(self.get_queryset(fields)),
+            request.user,
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True, fields=fields)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+    )
+    def cookable(self, request):
+        try:
+            ingredient_ids = {
+                int(pk)
+                for value in request.query_params.getlist('ingredients')
+                for pk in value.split(',')
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Ingredient ids must be integers'}
+            )
+        if not ingredient_ids:
+            raise ValidationError(
+                {'ingredients': 'At least one ingredient id is required'}
+            )
+        fields = self.get_requested_fields()
+        queryset = self.filter_queryset(self.get_queryset(fields)).cookable(
+            ingredient_ids
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True, fields=fields)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True, fields=fields)
+        return Response(serializer.data)
+
+    def filter_recipes_except(self, name):
+        """Filter recipes by the query params other than the given one.
+
+        Counts of a facet ignore its own filter, so that the other
+        values of the facet can still be offered to extend the query.
+        """
+        data = self.request.query_params.copy()
+        data.pop(name, None)
+        filterset = RecipeFilter(
+            data,
+            queryset=self.get_queryset(fields=set()),
+            request=self.request,
+        )
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+        return filterset.qs.order_by().values('pk')
+
+    def count_facets(self):
+        tags = Tag.objects.annotate(
+            count=Count(
+                'recipes',
+                filter=Q(recipes__in=self.filter_recipes_except('tags')),
+            )
+        ).order_by('name')
+        authors = Recipe.objects.filter(
+            pk__in=self.filter_recipes_except('author')
+        ).order_by().values('author_id', 'author__username').annotate(
+            count=Count('id')
+        ).order_by('-count', 'author__username')[:self.facet_authors_limit]
+        return {
+            'tags': [
+                {
+                    'id': tag.id,
+                    'name': tag.name,
+                    'color': tag.color,
+                    'slug': tag.slug,
+                    'count': tag.count,
+                }
+                for tag in tags
+            ],
+            'authors': [
+                {
+                    'id': author['author_id'],
+                    'username': author['author__username'],
+                    'count': author['count'],
+                }
+                for author in authors
+            ],
+        }
+
+    @action(
+        detail=False,
+        methods=['GET'],
+    )
+    def facets(self, request):
+        """Count recipes by tag and author under the current filters.
+
+        Responses without search and user-dependent filters are cached.
+        """
+        if is_shared_request(request) and not request.query_params.get(
+            'search'
+        ):
+            response = get_cached_response(
+                recipe_facets_cache_key(request),
+                lambda: Response(self.count_facets()),
+            )
+        else:
+            response = Response(self.count_facets())
+        return patch_response_caching(response, request)
+
+    @action(
+        detail=True,
+        methods=['GET'],
+    )
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        queryset = Recipe.objects.filter(
+            similar_to__recipe=recipe
+        ).order_by('-similar_to__score')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
         detail=True,
@@ -183,7 +475,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         recipe = get_object_or_404(Recipe, pk=pk)
         data = {
             'user': user.pk,
-            'recipe': recipe.pk
+            'recipe': recipe.pk,
+            'servings': request.data.get('servings', 1)
         }
         serializer = ShoppingCartSerializer(data=data)
         serializer.is_valid(raise_exception=True)
@@ -191,6 +484,24 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recipe)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @shopping_cart.mapping.patch
+    def update_shopping_cart(self, request, pk):
+        user = request.user
+        recipe = get_object_or_404(Recipe, pk=pk)
+        shopping_cart = get_object_or_404(
+            ShoppingCart, user=user, recipe=recipe
+        )
+        data = {
+            'servings': request.data.get('servings')
+        }
+        serializer = ShoppingCartSerializer(
+            shopping_cart, data=data, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        serializer = self.get_serializer(recipe)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
         user = request.user
@@ -209,17 +520,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def download_shopping_cart(self, request):
         user = request.user
-        ingredients = IngredientAmount.objects.filter(
-            recipe__shopping_cart__user=user).values(
-            name=F('ingredient__name'),
-            measurement_unit=F('ingredient__measurement_unit')).annotate(
-            amount=Sum('amount')
-        )
+        ingredients = IngredientAmount.objects.shopping_list(user)
         data = []
         for ingredient in ingredients:
             data.append(
                 f'{ingredient["name"]} - '
-                f'{ingredient["amount"]} '
+                f'{ingredient["amount"]:.12g} '
                 f'{ingredient["measurement_unit"]}'
             )
         content = 'Список покупок:\n\n' + '\n'.join(data)
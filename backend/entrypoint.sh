@@ -1,7 +1,10 @@
 #!/bin/sh
 
-python manage.py migrate
-python manage.py collectstatic --no-input
-gunicorn --bind 0:8000 foodgram.wsgi:application
+if [ "$RUN_MIGRATIONS" != "False" ]; then
+    python manage.py migrate --no-input
+fi
+if [ "$RUN_COLLECTSTATIC" != "False" ]; then
+    python manage.py collectstatic --no-input
+fi
 
-exec "$@"
\ No newline at end of file
+exec gunicorn --config gunicorn.conf.py
\ No newline at end of file
@@ -0,0 +1,105 @@
+import gzip
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# API responses and the shopping list only: HTML pages carry CSRF tokens,
+# which Django 3.2 does not mask per response, and compressing them would
+# expose the tokens to BREACH.
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'text/plain')
+COMPRESSIBLE_EXTENSIONS = ('.css', '.html', '.js', '.json', '.svg', '.txt')
+
+
+def gzip_compress(content):
+    """Gzip content with a fixed mtime, so the output is reproducible."""
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+
+def brotli_compress(content):
+    return brotli.compress(content, quality=5)
+
+
+def parse_accept_encoding(accept_encoding):
+    """Map content codings of an Accept-Encoding header to q-values."""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best encoding accepted by the client, if any.
+
+    Encodings with q=0 are refused, brotli wins ties with gzip.
+    """
+    qualities = parse_accept_encoding(accept_encoding)
+    default = qualities.get('*', 0.0)
+    encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+    encoding = max(
+        encodings, key=lambda coding: qualities.get(coding, default)
+    )
+    if qualities.get(encoding, default) > 0:
+        return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """Compress large API responses with brotli or gzip.
+
+    Unlike GZipMiddleware, short responses below COMPRESSION_MIN_SIZE
+    are left as is, since compressing them costs more than it saves.
+    """
+
+    compressors = {'br': brotli_compress, 'gzip': gzip_compress}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.is_compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+        content = self.compressors[encoding](response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+    @staticmethod
+    def is_compressible(response):
+        return (
+            not response.streaming
+            and not response.has_header('Content-Encoding')
+            and len(response.content) >= settings.COMPRESSION_MIN_SIZE
+            and response.get('Content-Type', '').startswith(
+                COMPRESSIBLE_CONTENT_TYPES
+            )
+        )
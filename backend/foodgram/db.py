@@ -0,0 +1,17 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def check_database_connection(**kwargs):
+    """Drop a broken persistent connection before the request uses it.
+
+    Backport of CONN_HEALTH_CHECKS from Django 4.1, where the setting is
+    handled by Django itself. Only the default database is checked, the
+    check costs a query and replicas are not read by most requests.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    if (
+        connection.settings_dict.get('CONN_HEALTH_CHECKS')
+        and connection.connection is not None
+        and not connection.is_usable()
+    ):
+        connection.close()
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+RECORD_FIELDS = ('duration', 'status_code', 'task', 'job_id')
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'process': record.process,
+        }
+        for field in RECORD_FIELDS:
+            if hasattr(record, field):
+                data[field] = getattr(record, field)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only a share of records below the given level."""
+
+    def __init__(self, rate=1.0, below_level='WARNING'):
+        super().__init__()
+        self.rate = float(rate)
+        self.below_level = logging.getLevelName(below_level)
+
+    def filter(self, record):
+        return (
+            record.levelno >= self.below_level
+            or random.random() < self.rate
+        )
+
+
+class QueueStreamHandler(QueueHandler):
+    """Hand records over to a background thread writing to a stream.
+
+    Formatting and writing happen in the listener thread, the logging
+    call only puts the record into an in-memory queue. The listener is
+    restarted in forked processes, e.g. gunicorn workers with
+    preload_app.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream)
+        self.start_listener()
+        os.register_at_fork(after_in_child=self.restart_listener)
+
+    def start_listener(self):
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def restart_listener(self):
+        self.queue = queue.SimpleQueue()
+        self.start_listener()
+
+    def setFormatter(self, fmt):  # noqa: N802
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        return record
+
+    def close(self):
+        self.listener.stop()
+        super().close()
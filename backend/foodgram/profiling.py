@@ -0,0 +1,134 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+PROFILING_SALT = 'foodgram.profiling'
+PROFILING_HEADER = 'HTTP_X_PROFILE_TOKEN'
+PROFILING_QUERY_PARAM = 'profile'
+
+
+def make_profiling_token(name):
+    """Sign a token allowing its holder to profile requests."""
+    return signing.TimestampSigner(salt=PROFILING_SALT).sign(name)
+
+
+def check_profiling_token(token):
+    try:
+        signing.TimestampSigner(salt=PROFILING_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class QueryLog:
+    """Execute wrapper recording SQL queries with their timings."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': self.alias,
+                'sql': sql,
+                'many': many,
+                'duration': time.perf_counter() - started,
+            })
+
+
+class ProfilingMiddleware:
+    """Profile a single request with cProfile on demand.
+
+    Requests with the `profile` query param are profiled for staff users
+    and for holders of a signed token sent in the X-Profile-Token header.
+    `profile=store` saves the profile, loadable with pstats or flame
+    graph tools, and the executed SQL into PROFILING_DIR and returns the
+    usual response, any other value replaces the response with a text
+    report. Unless PROFILING_ENABLED is set, the middleware removes
+    itself from the chain at startup.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (
+            PROFILING_QUERY_PARAM not in request.GET
+            or not self.is_allowed(request)
+        ):
+            return self.get_response(request)
+        profile = cProfile.Profile()
+        query_logs = [QueryLog(alias) for alias in connections]
+        with ExitStack() as stack:
+            for query_log in query_logs:
+                stack.enter_context(
+                    connections[query_log.alias].execute_wrapper(query_log)
+                )
+            started = time.perf_counter()
+            response = profile.runcall(self.get_response, request)
+            duration = time.perf_counter() - started
+        queries = [
+            query for query_log in query_logs for query in query_log.queries
+        ]
+        if request.GET[PROFILING_QUERY_PARAM] == 'store':
+            response['X-Profile-Id'] = self.store(profile, queries)
+            return response
+        return HttpResponse(
+            self.report(profile, queries, duration),
+            content_type='text/plain; charset=utf-8',
+        )
+
+    @staticmethod
+    def is_allowed(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            return True
+        token = request.META.get(PROFILING_HEADER)
+        return bool(token) and check_profiling_token(token)
+
+    @staticmethod
+    def store(profile, queries):
+        profile_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+        path = os.path.join(settings.PROFILING_DIR, profile_id)
+        profile.dump_stats(f'{path}.prof')
+        with open(f'{path}.sql.json', 'w') as file:
+            json.dump(queries, file, indent=2)
+        return profile_id
+
+    @staticmethod
+    def report(profile, queries, duration):
+        output = io.StringIO()
+        output.write(
+            f'Request took {duration * 1000:.1f} ms, '
+            f'{len(queries)} SQL queries took '
+            f'{sum(query["duration"] for query in queries) * 1000:.1f} ms\n\n'
+        )
+        for query in queries:
+            output.write(
+                f'{query["duration"] * 1000:8.2f} ms [{query["alias"]}] '
+                f'{query["sql"]}\n'
+            )
+        output.write('\n')
+        stats = pstats.Stats(profile, stream=output)
+        stats.sort_stats('cumulative').print_stats(settings.PROFILING_LIMIT)
+        return output.getvalue()
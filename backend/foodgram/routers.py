@@ -0,0 +1,44 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the default database within the block.
+
+    Shared caches are filled this way: they are invalidated on commit,
+    so an entry built from a lagging replica right after a write would
+    keep old data for its whole timeout.
+    """
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Send reads to a random replica while `replica_reads` is set.
+
+    Writes, migrations and reads outside of marked requests use the
+    default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(list(settings.DATABASE_REPLICAS))
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -25,17 +25,20 @@ INSTALLED_APPS = [
     'api',
     'users',
     'recipes',
+    'jobs',
     'djoser',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -56,32 +59,80 @@ TEMPLATES = [
     },
 ]
 
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'default': {
-            'format': '[DJANGO] %(levelname)s %(asctime)s %(module)s '
-                      '%(name)s.%(funcName)s:%(lineno)s: %(message)s'
+LOG_PROFILE = os.getenv('LOG_PROFILE', default='development')
+LOG_LEVEL = os.getenv('LOG_LEVEL', default='INFO')
+LOG_SQL_LEVEL = os.getenv('LOG_SQL_LEVEL', default='WARNING')
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', default=0.01))
+
+if LOG_PROFILE == 'production':
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'json': {
+                '()': 'foodgram.log.JsonFormatter',
+            },
         },
-    },
-    'handlers': {
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'default',
-        }
-    },
-    'loggers': {
-        '': {
-            'handlers': ['console'],
-            'level': 'DEBUG',
-            'propagate': True,
-        }
-    },
-}
+        'filters': {
+            'sample': {
+                '()': 'foodgram.log.SamplingFilter',
+                'rate': LOG_SAMPLE_RATE,
+            },
+            'sample_client_errors': {
+                '()': 'foodgram.log.SamplingFilter',
+                'rate': LOG_SAMPLE_RATE,
+                'below_level': 'ERROR',
+            },
+        },
+        'handlers': {
+            'queue': {
+                'class': 'foodgram.log.QueueStreamHandler',
+                'formatter': 'json',
+            },
+        },
+        'loggers': {
+            '': {
+                'handlers': ['queue'],
+                'level': LOG_LEVEL,
+            },
+            'django.db.backends': {
+                'level': LOG_SQL_LEVEL,
+                'filters': ['sample'],
+            },
+            'django.request': {
+                'level': 'WARNING',
+                'filters': ['sample_client_errors'],
+            },
+        },
+    }
+else:
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'formatters': {
+            'default': {
+                'format': '[DJANGO] %(levelname)s %(asctime)s %(module)s '
+                          '%(name)s.%(funcName)s:%(lineno)s: %(message)s'
+            },
+        },
+        'handlers': {
+            'console': {
+                'level': 'DEBUG',
+                'class': 'logging.StreamHandler',
+                'formatter': 'default',
+            }
+        },
+        'loggers': {
+            '': {
+                'handlers': ['console'],
+                'level': 'DEBUG',
+                'propagate': True,
+            }
+        },
+    }
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
 
 DATABASES = {
     'default': {
@@ -91,6 +142,38 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS') == 'True',
+        'DISABLE_SERVER_SIDE_CURSORS': (
+            os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS') == 'True'
+        ),
+    }
+}
+
+DATABASE_REPLICAS = {
+    f'replica_{index}': {
+        **DATABASES['default'],
+        'HOST': host,
+        'NAME': os.getenv('DB_REPLICA_NAME', default=os.getenv('DB_NAME')),
+        'TEST': {'MIRROR': 'default'},
+    }
+    for index, host in enumerate(os.getenv('DB_REPLICA_HOSTS', '').split())
+}
+DATABASES.update(DATABASE_REPLICAS)
+
+DATABASE_ROUTERS = ['foodgram.routers.ReplicaRouter']
+
+REPLICA_STICKINESS_SECONDS = int(
+    os.getenv('REPLICA_STICKINESS_SECONDS', default=10)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
     }
 }
 
@@ -121,6 +204,7 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+STATICFILES_STORAGE = 'foodgram.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -134,9 +218,24 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     "DEFAULT_PAGINATION_CLASS": "api.pagination.CustomPagination",
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonSlidingWindowThrottle',
+        'api.throttling.UserSlidingWindowThrottle',
+        'api.throttling.ActionSlidingWindowThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': os.getenv('THROTTLE_RATE_ANON', default='120/min'),
+        'user': os.getenv('THROTTLE_RATE_USER', default='300/min'),
+        'write': os.getenv('THROTTLE_RATE_WRITE', default='60/min'),
+        'search': os.getenv('THROTTLE_RATE_SEARCH', default='30/min'),
+        'download': os.getenv('THROTTLE_RATE_DOWNLOAD', default='10/min'),
+    },
+    # Clients are identified by X-Forwarded-For set by nginx, the last
+    # NUM_PROXIES addresses of it are trusted.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
 }
 
 DJOSER = {
@@ -155,3 +254,32 @@ DJOSER = {
         ],
     },
 }
+
+FEED_FANOUT_THRESHOLD = int(os.getenv('FEED_FANOUT_THRESHOLD', default=500))
+FEED_CACHE_SIZE = int(os.getenv('FEED_CACHE_SIZE', default=1000))
+FEED_CACHE_TIMEOUT = int(os.getenv('FEED_CACHE_TIMEOUT', default=60))
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', default=300))
+RECIPE_CACHE_MAX_AGE = int(os.getenv('RECIPE_CACHE_MAX_AGE', default=10))
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default=60))
+
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', default=1024))
+
+JOBS_MODE = os.getenv('JOBS_MODE', default='thread')
+JOBS_THREADS = int(os.getenv('JOBS_THREADS', default=2))
+JOBS_MAX_ATTEMPTS = int(os.getenv('JOBS_MAX_ATTEMPTS', default=3))
+JOBS_RETRY_DELAY = int(os.getenv('JOBS_RETRY_DELAY', default=10))
+JOBS_TIMEOUT = int(os.getenv('JOBS_TIMEOUT', default=600))
+JOBS_RETENTION = int(os.getenv('JOBS_RETENTION', default=7))
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED') == 'True'
+PROFILING_TOKEN_MAX_AGE = int(
+    os.getenv('PROFILING_TOKEN_MAX_AGE', default=3600)
+)
+PROFILING_DIR = os.getenv(
+    'PROFILING_DIR', default=os.path.join(BASE_DIR, 'profiles')
+)
+PROFILING_LIMIT = int(os.getenv('PROFILING_LIMIT', default=50))
@@ -0,0 +1,36 @@
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .compression import (COMPRESSIBLE_EXTENSIONS, brotli, brotli_compress,
+                          gzip_compress)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Store hashed static files along with their compressed copies.
+
+    nginx serves the `.gz` copies with gzip_static (and `.br` ones with
+    brotli_static when the module is available) instead of compressing
+    the files on every request.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        compressors = {'.gz': gzip_compress}
+        if brotli is not None:
+            compressors['.br'] = brotli_compress
+        for suffix, compress in compressors.items():
+            compressed = compress(content)
+            if len(compressed) >= len(content):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self.save(name + suffix, ContentFile(compressed))
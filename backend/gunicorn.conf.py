@@ -0,0 +1,47 @@
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+
+# The views are sync, so concurrent requests are served by threads. Under
+# ASGI Django 3.2 would run them one at a time per worker.
+wsgi_app = 'foodgram.wsgi:application'
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default='gthread')
+
+# Each thread holds its own persistent database connection, the cap
+# keeps the default within PostgreSQL max_connections.
+MAX_DEFAULT_WORKERS = 4
+
+
+def get_cpu_count():
+    """Return CPUs the process may run on, unlike cpu_count() of the host."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Threaded workers need no more than a process per CPU.
+workers = int(
+    os.getenv(
+        'GUNICORN_WORKERS',
+        default=min(get_cpu_count() + 1, MAX_DEFAULT_WORKERS),
+    )
+)
+threads = int(os.getenv('GUNICORN_THREADS', default=4))
+
+# Import the project once in the master so workers fork ready to serve.
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+
+# Recycle workers to bound memory growth, with jitter so they do not
+# restart all at once.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000))
+max_requests_jitter = int(
+    os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+)
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', default=30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', default=5))
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = '-'
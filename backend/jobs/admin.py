@@ -0,0 +1,24 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Job model in admin."""
+    list_display = (
+        'task', 'status', 'attempts', 'run_at', 'finished', 'duration'
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task__startswith',)
+    readonly_fields = ('key', 'created', 'started', 'finished', 'duration')
+    actions = ('retry',)
+
+    @admin.action(description='Retry selected jobs')
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+        )
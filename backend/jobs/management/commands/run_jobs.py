@@ -0,0 +1,67 @@
+import signal
+import time
+
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from jobs.models import Job
+from jobs.queue import claim_jobs, purge_jobs, requeue_stalled_jobs, run_job
+
+
+class Command(BaseCommand):
+    """Command to run background jobs stored in the database"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=10,
+            help='Number of jobs claimed at once',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when there are no due jobs',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when there are no due jobs left',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print job counts and average run time, then exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.stopping:
+            close_old_connections()
+            requeue_stalled_jobs()
+            jobs = claim_jobs(options['batch'])
+            for job in jobs:
+                run_job(job)
+            if jobs:
+                continue
+            if options['once']:
+                break
+            purge_jobs()
+            time.sleep(options['sleep'])
+
+    def stop(self, signum, frame):
+        """Finish the current batch before exiting."""
+        self.stopping = True
+
+    def print_stats(self):
+        for row in Job.objects.metrics():
+            duration = row['average_duration']
+            self.stdout.write(
+                f'{row["task"]} {row["status"]}: {row["count"]}'
+                + (f', {duration:.3f} s on average' if duration else '')
+            )
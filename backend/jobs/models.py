@@ -0,0 +1,107 @@
+from django.db import models
+from django.db.models import Avg, Count
+from django.utils import timezone
+
+
+class JobQuerySet(models.QuerySet):
+
+    def due(self):
+        return self.filter(status=Job.PENDING, run_at__lte=timezone.now())
+
+    def metrics(self):
+        """Count jobs and their average run time by task and status."""
+        return self.order_by('task', 'status').values(
+            'task', 'status'
+        ).annotate(
+            count=Count('id'),
+            average_duration=Avg('duration'),
+        )
+
+
+class Job(models.Model):
+    """Deferred call of a function by its dotted path."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUSES = [
+        (PENDING, 'pending'),
+        (RUNNING, 'running'),
+        (DONE, 'done'),
+        (FAILED, 'failed'),
+    ]
+
+    task = models.CharField(
+        max_length=200,
+        verbose_name='Task',
+    )
+    args = models.JSONField(
+        default=list,
+        verbose_name='Arguments',
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        verbose_name='Keyword arguments',
+    )
+    key = models.CharField(
+        max_length=32,
+        verbose_name='Key',
+        help_text='digest of the task and arguments',
+    )
+    status = models.CharField(
+        default=PENDING,
+        choices=STATUSES,
+        max_length=10,
+        verbose_name='Status',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Attempts',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name='Max attempts',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Run at',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Created',
+    )
+    started = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Started',
+    )
+    finished = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Finished',
+    )
+    duration = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name='Duration',
+        help_text='in seconds',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Error',
+    )
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('status', 'run_at')),
+            models.Index(fields=('key', 'status')),
+        )
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+
+    def __str__(self):
+        return f'{self.task} ({self.status})'
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger('jobs')
+
+
+def get_task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def get_job_key(task, args, kwargs):
+    payload = json.dumps([task, args, kwargs], sort_keys=True)
+    return hashlib.md5(payload.encode()).hexdigest()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run the function in background with JSON serializable arguments.
+
+    Depending on JOBS_MODE the call is:
+    - database: stored as a job for the `run_jobs` worker, along with
+      the current transaction, unless the same call is already pending;
+    - thread: submitted to an in-process thread pool after commit, for
+      development without a worker;
+    - sync: made right after commit.
+    """
+    task = get_task_name(func)
+    args = list(args)
+    if settings.JOBS_MODE == 'database':
+        key = get_job_key(task, args, kwargs)
+        if Job.objects.filter(key=key, status=Job.PENDING).exists():
+            return
+        Job.objects.create(
+            task=task,
+            args=args,
+            kwargs=kwargs,
+            key=key,
+            max_attempts=settings.JOBS_MAX_ATTEMPTS,
+        )
+    elif settings.JOBS_MODE == 'thread':
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_thread, task, args, kwargs)
+        )
+    else:
+        transaction.on_commit(lambda: run_task(task, args, kwargs))
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.JOBS_THREADS,
+        thread_name_prefix='jobs',
+    )
+
+
+def get_retry_delay(attempt):
+    """Back off exponentially from JOBS_RETRY_DELAY seconds."""
+    return settings.JOBS_RETRY_DELAY * 2 ** (attempt - 1)
+
+
+def run_task(task, args, kwargs):
+    """Call the task and log how long it took."""
+    started = time.monotonic()
+    import_string(task)(*args, **kwargs)
+    duration = time.monotonic() - started
+    logger.info(
+        'Job %s done in %.3f s',
+        task,
+        duration,
+        extra={'task': task, 'duration': duration},
+    )
+
+
+def run_in_thread(task, args, kwargs):
+    max_attempts = settings.JOBS_MAX_ATTEMPTS
+    try:
+        for attempt in range(1, max_attempts + 1):
+            close_old_connections()
+            try:
+                run_task(task, args, kwargs)
+                return
+            except Exception:
+                logger.exception(
+                    'Job %s failed, attempt %d of %d',
+                    task, attempt, max_attempts,
+                )
+                if attempt < max_attempts:
+                    time.sleep(get_retry_delay(attempt))
+    finally:
+        close_old_connections()
+
+
+def claim_jobs(limit):
+    """Mark due jobs as running and return them.
+
+    Jobs locked by other workers are skipped, so several workers can
+    share the queue.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.due().select_for_update(skip_locked=True).order_by(
+                'run_at', 'id'
+            )[:limit]
+        )
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING,
+            started=now,
+            attempts=F('attempts') + 1,
+        )
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.started = now
+        job.attempts += 1
+    return jobs
+
+
+def run_job(job):
+    """Run a claimed job, retry it later on failure while attempts last."""
+    started = time.monotonic()
+    try:
+        run_task(job.task, job.args, job.kwargs)
+    except Exception:
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(
+                seconds=get_retry_delay(job.attempts)
+            )
+        else:
+            job.status = Job.FAILED
+        logger.exception(
+            'Job %s failed, attempt %d of %d',
+            job.task, job.attempts, job.max_attempts,
+            extra={'task': job.task, 'job_id': job.pk},
+        )
+    else:
+        job.status = Job.DONE
+        job.error = ''
+    job.finished = timezone.now()
+    job.duration = time.monotonic() - started
+    job.save(
+        update_fields=('status', 'run_at', 'error', 'finished', 'duration')
+    )
+
+
+def requeue_stalled_jobs():
+    """Return to the queue jobs of workers which died while running them."""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        started__lt=timezone.now() - timedelta(seconds=settings.JOBS_TIMEOUT),
+    ).update(status=Job.PENDING, run_at=timezone.now())
+
+
+def purge_jobs():
+    """Delete successful jobs older than JOBS_RETENTION days."""
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(
+            days=settings.JOBS_RETENTION
+        ),
+    ).delete()[0]
@@ -1,19 +1,29 @@
 from django.contrib import admin
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
-                     ShoppingCart, Tag)
+                     ShoppingCart, Tag, UnitConversion)
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     """Ingredient model in admin."""
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    search_fields = ('name__startswith',)
+
+
+@admin.register(UnitConversion)
+class UnitConversionAdmin(admin.ModelAdmin):
+    """Unit Conversion model in admin."""
+    list_display = ('unit', 'canonical_unit', 'factor')
 
 
 class IngredientsInline(admin.TabularInline):
     model = IngredientAmount
     extra = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Tag)
@@ -26,27 +36,65 @@ class TagAdmin(admin.ModelAdmin):
 class RecipeAdmin(admin.ModelAdmin):
     """Recipe model in admin."""
     list_display = ('name', 'author', 'text', 'added_to_favorite')
-    list_filter = ('author', 'name', 'tags')
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name__startswith', 'author__username__startswith')
+    autocomplete_fields = ('author',)
     inlines = (IngredientsInline,)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        favorite_count = Favorite.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
+        return super().get_queryset(request).annotate(
+            favorite_count=Coalesce(Subquery(favorite_count), 0)
+        )
 
-    @staticmethod
-    def added_to_favorite(obj):
-        return obj.favorite.count()
+    @admin.display(ordering='favorite_count')
+    def added_to_favorite(self, obj):
+        return obj.favorite_count
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Recipe.objects.filter(pk=form.instance.pk).update_ingredients()
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     """Favorite model in admin."""
     list_display = ('id', 'recipe', 'user')
+    list_select_related = ('recipe', 'user')
+    raw_id_fields = ('recipe', 'user')
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     """Shopping Cart model in admin."""
-    list_display = ('id', 'recipe', 'user')
+    list_display = ('id', 'recipe', 'user', 'servings')
+    list_select_related = ('recipe', 'user')
+    raw_id_fields = ('recipe', 'user')
 
 
 @admin.register(IngredientAmount)
 class IngredientAmountAdmin(admin.ModelAdmin):
     """Ingredient Amount model in admin."""
     list_display = ('id', 'ingredient', 'recipe', 'amount')
+    list_select_related = ('ingredient', 'recipe')
+    autocomplete_fields = ('ingredient',)
+    raw_id_fields = ('recipe',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Recipe.objects.filter(pk=obj.recipe_id).update_ingredients()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Recipe.objects.filter(pk=obj.recipe_id).update_ingredients()
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Recipe.objects.filter(pk__in=recipe_ids).update_ingredients()
@@ -0,0 +1,55 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_add_date(apps, schema_editor):
+    """Date old entries by their recipe, not by the migration run."""
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for model_name in ('Favorite', 'ShoppingCart'):
+        model = apps.get_model('recipes', model_name)
+        model.objects.update(
+            add_date=models.Subquery(
+                Recipe.objects.filter(
+                    pk=models.OuterRef('recipe_id')
+                ).values('pub_date')
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRanking',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='recipes.recipe', verbose_name='Recipe')),
+                ('popular_score', models.FloatField(db_index=True, default=0, verbose_name='Popularity score')),
+                ('trending_score', models.FloatField(db_index=True, default=0, verbose_name='Trending score')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Updated')),
+            ],
+            options={
+                'verbose_name': 'Recipe ranking',
+                'verbose_name_plural': 'Recipe rankings',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='add_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Date added'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='add_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=django.utils.timezone.now, verbose_name='Date added'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_add_date, migrations.RunPython.noop),
+    ]
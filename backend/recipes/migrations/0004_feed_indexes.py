@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipe_ranking'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date'], name='recipes_rec_author__a19ae0_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:33
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+CREATE_INDEX = (
+    'CREATE INDEX recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx'
+UPDATE_SEARCH_VECTOR = '''
+    UPDATE recipes_recipe AS recipe SET search_vector =
+        setweight(to_tsvector(%(config)s::regconfig, recipe.name), 'A')
+        || setweight(to_tsvector(%(config)s::regconfig, recipe.text), 'B')
+        || setweight(to_tsvector(%(config)s::regconfig, coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_ingredientamount AS amount
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = amount.ingredient_id
+            WHERE amount.recipe_id = recipe.id
+        ), '')), 'C')
+'''
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(
+        UPDATE_SEARCH_VECTOR, {'config': settings.SEARCH_CONFIG}
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Search vector'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_ingredients(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    ingredients_count = IngredientAmount.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        count=Count('pk')
+    ).values('count')
+    Recipe.objects.update(
+        ingredients_count=Coalesce(Subquery(ingredients_count), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Ingredients count'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredientamount',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipes_ing_ingredi_6e59d4_idx'),
+        ),
+        migrations.RunPython(count_ingredients, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+UNIT_CONVERSIONS = (
+    ('кг', 'г', 1000),
+    ('л', 'мл', 1000),
+    ('ст. л.', 'мл', 15),
+    ('ч. л.', 'мл', 5),
+)
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    IngredientAmount = apps.get_model('recipes', 'IngredientAmount')
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        count=Count('id'), keep_id=Min('id')
+    ).filter(count__gt=1)
+    for duplicate in duplicates:
+        ingredients = Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(id=duplicate['keep_id'])
+        IngredientAmount.objects.filter(ingredient__in=ingredients).update(
+            ingredient_id=duplicate['keep_id']
+        )
+        ingredients.delete()
+
+
+def create_unit_conversions(apps, schema_editor):
+    UnitConversion = apps.get_model('recipes', 'UnitConversion')
+    UnitConversion.objects.bulk_create(
+        UnitConversion(unit=unit, canonical_unit=canonical_unit,
+                       factor=factor)
+        for unit, canonical_unit, factor in UNIT_CONVERSIONS
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_similar_recipe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitConversion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit', models.CharField(max_length=150, unique=True, verbose_name='Measurement Unit')),
+                ('canonical_unit', models.CharField(max_length=150, verbose_name='Canonical Measurement Unit')),
+                ('factor', models.FloatField(help_text='Amount of canonical units in one unit', verbose_name='Factor')),
+            ],
+            options={
+                'verbose_name': 'Unit conversion',
+                'verbose_name_plural': 'Unit conversions',
+                'ordering': ('unit',),
+            },
+        ),
+        migrations.RunPython(
+            create_unit_conversions, migrations.RunPython.noop
+        ),
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
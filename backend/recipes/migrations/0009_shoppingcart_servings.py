@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:38
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_unit_conversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, help_text='How many times the recipe will be cooked', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Servings'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:10
+
+from django.db import migrations, models
+import recipes.models
+
+CREATE_INDEX = (
+    'CREATE INDEX recipes_recipe_ingredient_ids_idx '
+    'ON recipes_recipe USING gin (ingredient_ids)'
+)
+DROP_INDEX = 'DROP INDEX IF EXISTS recipes_recipe_ingredient_ids_idx'
+UPDATE_INGREDIENT_IDS = '''
+    UPDATE recipes_recipe AS recipe SET ingredient_ids = (
+        SELECT array_agg(amount.ingredient_id ORDER BY amount.ingredient_id)
+        FROM recipes_ingredientamount AS amount
+        WHERE amount.recipe_id = recipe.id
+    )
+'''
+
+
+def create_ingredient_ids_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(UPDATE_INGREDIENT_IDS)
+    schema_editor.execute(CREATE_INDEX)
+
+
+def drop_ingredient_ids_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=recipes.models.IntegerArrayField(base_field=models.IntegerField(), editable=False, null=True, size=None, verbose_name='Ingredient ids'),
+        ),
+        migrations.RunPython(
+            create_ingredient_ids_index, drop_ingredient_ids_index
+        ),
+    ]
@@ -1,5 +1,15 @@
-from django.db import models
-from django.db.models import Exists, OuterRef
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg, StringAgg
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                            SearchRank, SearchVector,
+                                            SearchVectorField)
+from django.core.validators import MinValueValidator
+from django.db import connections, models
+from django.db.models import (Case, Count, Exists, F, Func, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from users.models import User
 
 
@@ -8,6 +18,7 @@ class Ingredient(models.Model):
     name = models.CharField(
         blank=False,
         max_length=150,
+        db_index=True,
         verbose_name='Name',
     )
     measurement_unit = models.CharField(
@@ -18,6 +29,12 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient',
+            ),
+        )
         verbose_name = 'Ingredient'
         verbose_name_plural = 'Ingredients'
 
@@ -25,6 +42,31 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+class UnitConversion(models.Model):
+    """Measurement unit conversion model."""
+    unit = models.CharField(
+        max_length=150,
+        unique=True,
+        verbose_name='Measurement Unit',
+    )
+    canonical_unit = models.CharField(
+        max_length=150,
+        verbose_name='Canonical Measurement Unit',
+    )
+    factor = models.FloatField(
+        verbose_name='Factor',
+        help_text='Amount of canonical units in one unit',
+    )
+
+    class Meta:
+        ordering = ('unit',)
+        verbose_name = 'Unit conversion'
+        verbose_name_plural = 'Unit conversions'
+
+    def __str__(self):
+        return f'1 {self.unit} = {self.factor:g} {self.canonical_unit}'
+
+
 class Tag(models.Model):
     """Tag model."""
     name = models.CharField(
@@ -52,6 +94,27 @@ class Tag(models.Model):
         return self.name
 
 
+class IntegerArrayField(ArrayField):
+    """Array of integers, kept NULL out of PostgreSQL."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('base_field', models.IntegerField())
+        super().__init__(**kwargs)
+
+    def get_placeholder(self, value, compiler, connection):
+        # The array cast is PostgreSQL syntax.
+        if connection.vendor != 'postgresql':
+            return '%s'
+        return super().get_placeholder(value, compiler, connection)
+
+
+class ArrayMissingCount(Func):
+    """Count elements of the first array absent from the second one."""
+    arg_joiner = ') AS element WHERE element <> ALL ('
+    template = '(SELECT count(*) FROM unnest(%(expressions)s))'
+    output_field = models.IntegerField()
+
+
 class RecipeQuerySet(models.QuerySet):
     """Recipe QuerySet."""
 
@@ -76,6 +139,141 @@ class RecipeQuerySet(models.QuerySet):
             ),
         )
 
+    def search(self, query):
+        """Full-text search by name, text and ingredient names.
+
+        Uses the stored `search_vector` on PostgreSQL and falls back to
+        case-insensitive substring search on other databases.
+        """
+        if connections[self.db].vendor != 'postgresql':
+            return self.filter(
+                Q(name__icontains=query)
+                | Q(text__icontains=query)
+                | Q(ingredients__name__icontains=query)
+            ).distinct()
+        search_query = SearchQuery(
+            query,
+            config=settings.SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        return self.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query),
+            search_snippet=SearchHeadline(
+                'text',
+                search_query,
+                config=settings.SEARCH_CONFIG,
+                max_words=30,
+                min_words=15,
+            ),
+        ).order_by('-search_rank', '-pub_date')
+
+    def cookable(self, ingredient_ids):
+        """Rank recipes by coverage with the given ingredients.
+
+        Recipes sharing at least one ingredient come first if they can be
+        fully cooked, then by the fewest missing ingredients. In
+        PostgreSQL the precomputed `ingredient_ids` arrays are matched
+        with `&&` and `<@` over their GIN index, elsewhere matches are
+        counted over the (ingredient, recipe) index of IngredientAmount.
+        """
+        if connections[self.db].vendor == 'postgresql':
+            ingredient_ids = sorted(ingredient_ids)
+            return self.filter(
+                ingredient_ids__overlap=ingredient_ids
+            ).annotate(
+                missing_ingredients=Case(
+                    When(
+                        ingredient_ids__contained_by=ingredient_ids,
+                        then=Value(0),
+                    ),
+                    default=ArrayMissingCount(
+                        'ingredient_ids',
+                        Value(
+                            ingredient_ids,
+                            output_field=IntegerArrayField(),
+                        ),
+                    ),
+                ),
+                matched_ingredients=(
+                    F('ingredients_count') - F('missing_ingredients')
+                ),
+            ).order_by(
+                'missing_ingredients', '-matched_ingredients', '-pub_date'
+            )
+        postings = IngredientAmount.objects.filter(
+            ingredient_id__in=ingredient_ids
+        )
+        matched = postings.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
+        return self.filter(
+            pk__in=postings.values('recipe_id')
+        ).annotate(
+            matched_ingredients=Subquery(matched),
+            missing_ingredients=(
+                F('ingredients_count') - F('matched_ingredients')
+            ),
+        ).order_by(
+            'missing_ingredients', '-matched_ingredients', '-pub_date'
+        )
+
+    def update_ingredients_count(self):
+        ingredients_count = IngredientAmount.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            count=Count('pk')
+        ).values('count')
+        self.update(
+            ingredients_count=Coalesce(Subquery(ingredients_count), 0)
+        )
+
+    def update_ingredient_ids(self):
+        """Store sorted ingredient ids, a no-op out of PostgreSQL."""
+        if connections[self.db].vendor != 'postgresql':
+            return
+        ingredient_ids = IngredientAmount.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            ids=ArrayAgg('ingredient_id', ordering='ingredient_id')
+        ).values('ids')
+        self.update(ingredient_ids=Subquery(ingredient_ids))
+
+    def update_ingredients(self):
+        """Recompute ingredient data after edits outside of the API."""
+        self.update_ingredients_count()
+        self.update_ingredient_ids()
+
+    def touch(self):
+        """Mark recipes as modified, e.g. after their relations changed."""
+        self.update(updated_at=timezone.now())
+
+    def update_search_vector(self):
+        """Rebuild the stored search vector, a no-op out of PostgreSQL."""
+        if connections[self.db].vendor != 'postgresql':
+            return
+        ingredient_names = IngredientAmount.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', delimiter=' ')
+        ).values('names')
+        self.update(
+            search_vector=(
+                SearchVector(
+                    'name', weight='A', config=settings.SEARCH_CONFIG
+                )
+                + SearchVector(
+                    'text', weight='B', config=settings.SEARCH_CONFIG
+                )
+                + SearchVector(
+                    Coalesce(Subquery(ingredient_names), Value('')),
+                    weight='C',
+                    config=settings.SEARCH_CONFIG,
+                )
+            )
+        )
+
 
 class Recipe(models.Model):
     """Recipe model."""
@@ -117,11 +315,33 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Publications Date',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Modification Date',
+    )
+    ingredients_count = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Ingredients count',
+    )
+    ingredient_ids = IntegerArrayField(
+        null=True,
+        editable=False,
+        verbose_name='Ingredient ids',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Search vector',
+    )
 
     objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('author', '-pub_date')),
+        )
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
 
@@ -129,6 +349,38 @@ class Recipe(models.Model):
         return self.name
 
 
+class IngredientAmountQuerySet(models.QuerySet):
+    """IngredientAmount QuerySet."""
+
+    def shopping_list(self, user):
+        """Sum ingredients of the user's shopping cart in one query.
+
+        Amounts are scaled by servings of the cart entry and converted to
+        canonical units, so the same ingredient measured in grams and
+        kilograms becomes a single line.
+        """
+        conversion = UnitConversion.objects.filter(
+            unit=OuterRef('ingredient__measurement_unit')
+        ).order_by()
+        return self.filter(recipe__shopping_cart__user=user).values(
+            name=F('ingredient__name'),
+            measurement_unit=Coalesce(
+                Subquery(conversion.values('canonical_unit')[:1]),
+                F('ingredient__measurement_unit'),
+            ),
+        ).annotate(
+            amount=Sum(
+                F('amount')
+                * F('recipe__shopping_cart__servings')
+                * Coalesce(
+                    Subquery(conversion.values('factor')[:1]),
+                    Value(1.0),
+                ),
+                output_field=models.FloatField(),
+            )
+        ).order_by('name')
+
+
 class IngredientAmount(models.Model):
     """Ingredient amount model."""
     ingredient = models.ForeignKey(
@@ -147,7 +399,12 @@ class IngredientAmount(models.Model):
         verbose_name='Amount',
     )
 
+    objects = IngredientAmountQuerySet.as_manager()
+
     class Meta:
+        indexes = (
+            models.Index(fields=('ingredient', 'recipe')),
+        )
         verbose_name = 'Ingredient amount'
         verbose_name_plural = 'Ingredients amount'
 
@@ -169,6 +426,11 @@ class Favorite(models.Model):
         related_name='favorite',
         verbose_name='User added to favorites',
     )
+    add_date = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Date added',
+    )
 
     class Meta:
         verbose_name = 'Favorite'
@@ -189,7 +451,86 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='User added to shopping cart',
     )
+    servings = models.PositiveSmallIntegerField(
+        default=1,
+        validators=(MinValueValidator(1),),
+        verbose_name='Servings',
+        help_text='How many times the recipe will be cooked',
+    )
+    add_date = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Date added',
+    )
 
     class Meta:
         verbose_name = 'Shopping Cart'
         verbose_name_plural = 'Shopping Carts'
+
+
+class RecipeRanking(models.Model):
+    """Precomputed recipe ranking model."""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Recipe',
+    )
+    popular_score = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Popularity score',
+    )
+    trending_score = models.FloatField(
+        default=0,
+        db_index=True,
+        verbose_name='Trending score',
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Updated',
+    )
+
+    class Meta:
+        verbose_name = 'Recipe ranking'
+        verbose_name_plural = 'Recipe rankings'
+
+    def __str__(self):
+        return f'{self.recipe}: {self.popular_score}, {self.trending_score}'
+
+
+class SimilarRecipe(models.Model):
+    """Precomputed similar recipe model."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Recipe',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Similar recipe',
+    )
+    score = models.FloatField(
+        verbose_name='Similarity score',
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('recipe', '-score')),
+        )
+        verbose_name = 'Similar recipe'
+        verbose_name_plural = 'Similar recipes'
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar}: {self.score:.2f}'
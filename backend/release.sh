@@ -0,0 +1,4 @@
+#!/bin/sh
+
+python manage.py migrate --no-input
+python manage.py collectstatic --no-input
\ No newline at end of file
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Subscription, User
+from .models import AuthorStats, Subscription, User
 
 
 @admin.register(User)
@@ -8,10 +8,24 @@ class UserAdmin(admin.ModelAdmin):
     """User model in admin."""
     list_display = ('id', 'email', 'username', 'first_name', 'last_name',
                     'password', 'role')
-    list_filter = ('username', 'email')
+    list_filter = ('role', 'is_active', 'is_staff')
+    search_fields = ('email__startswith', 'username__startswith')
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     """Subscription model in admin."""
     list_display = ('id', 'user', 'author',)
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    """Author Stats model in admin."""
+    list_display = (
+        'user', 'recipes_count', 'subscribers_count', 'favorites_count'
+    )
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    readonly_fields = ('recipes_count', 'subscribers_count', 'favorites_count')
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-19 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['user', 'author'], name='users_subsc_user_id_66eb89_idx'),
+        ),
+    ]
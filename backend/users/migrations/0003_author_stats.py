@@ -0,0 +1,67 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_by_author(queryset, author_field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{author_field: OuterRef('user_id')}).order_by(
+            ).values(author_field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0,
+    )
+
+
+def count_author_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    AuthorStats = apps.get_model('users', 'AuthorStats')
+    Subscription = apps.get_model('users', 'Subscription')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('recipes', 'Favorite')
+    AuthorStats.objects.bulk_create(
+        (
+            AuthorStats(user_id=user_id)
+            for user_id in User.objects.values_list('id', flat=True)
+        ),
+        batch_size=1000,
+    )
+    AuthorStats.objects.update(
+        recipes_count=count_by_author(Recipe.objects.all(), 'author'),
+        subscribers_count=count_by_author(
+            Subscription.objects.all(), 'author'
+        ),
+        favorites_count=count_by_author(
+            Favorite.objects.all(), 'recipe__author'
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_updated_at'),
+        ('users', '0002_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='users.user', verbose_name='Author')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Recipes count')),
+                ('subscribers_count', models.PositiveIntegerField(default=0, verbose_name='Subscribers count')),
+                ('favorites_count', models.PositiveIntegerField(default=0, help_text='times recipes of the user were added to favorites', verbose_name='Favorites count')),
+            ],
+            options={
+                'verbose_name': 'Author stats',
+                'verbose_name_plural': 'Author stats',
+            },
+        ),
+        migrations.RunPython(count_author_stats, migrations.RunPython.noop),
+    ]
@@ -89,8 +89,46 @@ class Subscription(models.Model):
     )
 
     class Meta:
+        indexes = (
+            models.Index(fields=('user', 'author')),
+        )
         verbose_name = 'Subscription'
         verbose_name_plural = 'Subscriptions'
 
     def __str__(self):
         return f'{self.user} subscribed on {self.author}'
+
+
+class AuthorStats(models.Model):
+    """Counters of an author, changed only with atomic increments.
+
+    They live apart from User, so saving a user never overwrites them
+    with values loaded earlier.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Author',
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Recipes count',
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Subscribers count',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Favorites count',
+        help_text='times recipes of the user were added to favorites',
+    )
+
+    class Meta:
+        verbose_name = 'Author stats'
+        verbose_name_plural = 'Author stats'
+
+    def __str__(self):
+        return f'Stats of {self.user}'